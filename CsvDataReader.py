@@ -12,24 +12,34 @@ class CsvDataReader:
         """
         self.csv_file = csv_file
 
+    @staticmethod
+    def reorder_columns(df):
+        """
+        Moves the image, well, position and filter columns to the front.
+        """
+        # Reorder columns with ImageFileName first
+        cols = df.columns.tolist()
+        cols.insert(0, cols.pop(cols.index('ImageFileName')))
+        cols.insert(1, cols.pop(cols.index('Well')))
+        cols.insert(2, cols.pop(cols.index('PositionXUm')))
+        cols.insert(3, cols.pop(cols.index('PositionYUm')))
+        cols.insert(4, cols.pop(cols.index('PositionZUm')))
+        cols.insert(5, cols.pop(cols.index('ExcitationEmissionFilter')))
+        return df[cols]
+
+    def read_data(self):
+        """
+        Reads the CSV file and reorders columns, raising on invalid files.
+        """
+        df = pd.read_csv(self.csv_file)
+        return self.reorder_columns(df)
+
     def extract_data(self):
         """
         Extracts data from the CSV file and reorders columns.
         """
         try:
-            df = pd.read_csv(self.csv_file)
-
-            # Reorder columns with ImageFileName first
-            cols = df.columns.tolist()
-            cols.insert(0, cols.pop(cols.index('ImageFileName')))
-            cols.insert(1, cols.pop(cols.index('Well')))
-            cols.insert(2, cols.pop(cols.index('PositionXUm')))
-            cols.insert(3, cols.pop(cols.index('PositionYUm')))
-            cols.insert(4, cols.pop(cols.index('PositionZUm')))
-            cols.insert(5, cols.pop(cols.index('ExcitationEmissionFilter')))
-            df = df[cols]
-
-            return df
+            return self.read_data()
         except Exception as e:
             st.error(f"An error occurred while processing CSV data: {e}")
             return None
\ No newline at end of file
@@ -0,0 +1,490 @@
+"""
+Benchmark suite for the MXA Analyzer readers and image pipeline.
+
+Generates synthetic acquisition CSVs, .jdce documents, .mxprotocol files and
+16-bit TIFFs into a temporary folder, times each stage and reports throughput
+and the peak memory traced by tracemalloc (Python and numpy allocations only).
+Results can be saved as a baseline and later runs compared against it with a
+regression threshold. Cases call the raising readers, so a broken reader fails
+the run instead of being timed as a fast success.
+
+    python benchmark.py --scale 1.0 --save-baseline
+    python benchmark.py --scale 1.0 --threshold 0.2
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Any, List
+
+import numpy as np
+import tifffile
+
+from CsvDataReader import CsvDataReader
+from JdceDataReader import JdceDataReader
+from protocol import ProtocolDataExtractor
+from tiffMetadata import read_tiff_metadata
+from imageDisplay import render_preview, render_roi_preview, encode_preview, zoom_roi
+from liveIngest import CsvTailer
+from plateValidation import PlateValidator
+from multiFileLoader import MultiFileLoader
+from structuralDiff import StructuralDiff, build_tree
+from metadataCatalog import MetadataCatalog, parse_query
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Synthetic 384-well plate geometry, in micrometres
+PLATE_ROWS = 16
+PLATE_COLUMNS = 24
+TOP_LEFT_OFFSET = {"X": 12130.0, "Y": 8990.0}
+WELL_SPACING = {"X": 4500.0, "Y": 4500.0}
+WELL_SIZE = {"Width": 3650.0, "Height": 3650.0}
+
+FILTERS = ["DAPI", "FITC", "TRITC", "Cy5", "TL"]
+
+
+# --- Synthetic data generators ---
+def well_names(rows: int = PLATE_ROWS, columns: int = PLATE_COLUMNS) -> List[str]:
+    """Return well names in row-major order, e.g. A01, A02, ..."""
+    return [f"{chr(ord('A') + r)}{c + 1:02d}" for r in range(rows) for c in range(columns)]
+
+
+def make_csv(path: str, rows: int, rng: np.random.Generator) -> None:
+    """Write an acquisition CSV with per-image well, position and filter columns"""
+    import pandas as pd
+
+    wells = np.array(well_names())
+    well_idx = rng.integers(0, len(wells), rows)
+    row_idx, col_idx = np.divmod(well_idx, PLATE_COLUMNS)
+    center_x = TOP_LEFT_OFFSET["X"] + col_idx * WELL_SPACING["X"]
+    center_y = TOP_LEFT_OFFSET["Y"] + row_idx * WELL_SPACING["Y"]
+    half_w = WELL_SIZE["Width"] / 2
+    half_h = WELL_SIZE["Height"] / 2
+    filters = np.array(FILTERS[:-1])
+
+    # Columns deliberately out of the order CsvDataReader produces
+    df = pd.DataFrame({
+        "TimePoint": rng.integers(1, 4, rows),
+        "Site": rng.integers(1, 10, rows),
+        "ExcitationEmissionFilter": filters[rng.integers(0, len(filters), rows)],
+        "PositionZUm": rng.normal(5200.0, 15.0, rows).round(2),
+        "ExposureMs": rng.choice([50.0, 100.0, 200.0, 400.0], rows),
+        "PositionYUm": (center_y + rng.uniform(-half_h, half_h, rows) * 0.9).round(2),
+        "PositionXUm": (center_x + rng.uniform(-half_w, half_w, rows) * 0.9).round(2),
+        "Well": wells[well_idx],
+        "ZIndex": rng.integers(0, 5, rows),
+        "ImageFileName": [f"img_{i:08d}.tif" for i in range(rows)],
+    })
+    df.to_csv(path, index=False)
+
+
+def make_jdce(path: str, metadata_files: int, wavelengths: int) -> None:
+    """Write a .jdce document with large ImageMetadataFiles and Wavelengths lists"""
+    document = {
+        "Version": "2.0",
+        "ImageStack": {
+            "PlateId": "PLATE-0001",
+            "Uuid": "00000000-0000-4000-8000-000000000001",
+            "ImageFormat": "TIFF",
+            "LargeImage": False,
+            "CollectionComplete": True,
+            "Application": {"Name": "MetaXpress", "SoftwareLabel": "6.7.2"},
+            "Creation": {"Date": "2025-01-31", "Time": "12:00:00", "TimeZoneOffset": "+00:00"},
+            "AutoLeadAcquisitionProtocol": {
+                "Camera": {"Size": {"Width": 2048, "Height": 2048}, "Binning": 1},
+                "ObjectiveCalibration": {
+                    "Unit": "um", "ObjectiveName": "20X Plan Apo",
+                    "PixelWidth": 0.3428, "PixelHeight": 0.3428,
+                },
+                "Plate": {
+                    "Name": "384 Well Plate",
+                    "Rows": PLATE_ROWS,
+                    "Columns": PLATE_COLUMNS,
+                    "TopLeftWellCenterOffset": TOP_LEFT_OFFSET,
+                    "WellParameters": {"Shape": "Square", **WELL_SIZE},
+                    "WellSpacing": WELL_SPACING,
+                },
+                "Wavelengths": [
+                    {
+                        "Index": i,
+                        "ImagingMode": "Widefield",
+                        "ZSlice": 1,
+                        "ZStep": 0.0,
+                        "EmissionFilter": FILTERS[i % len(FILTERS)],
+                        "ExcitationFilter": FILTERS[i % len(FILTERS)],
+                    }
+                    for i in range(wavelengths)
+                ],
+                "PlateMap": {"ZDimensionParameters": {"Slices": 1}, "TimeSchedule": {"Points": 1}},
+                "ProjectInformation": {"Project": {"Name": "Benchmark"}, "User": {"Name": "bench"}},
+            },
+            "Operator": {"Login": "bench"},
+            "SpecimenHolder": {"Type": "Plate", "Label": "P1", "Barcode": "BC0001", "Description": ""},
+            "ImageMetadataFiles": [f"metadata/img_{i:08d}.xml" for i in range(metadata_files)],
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+
+
+def make_protocol(path: str, wells: int, sites: int) -> None:
+    """Write a .mxprotocol file with large wellList/siteList structures"""
+    names = well_names()
+    well_list = [
+        {"name": names[i % len(names)], "row": (i % len(names)) // PLATE_COLUMNS,
+         "column": (i % len(names)) % PLATE_COLUMNS, "selected": True}
+        for i in range(wells)
+    ]
+    site_list = [{"index": i, "x": (i % 10) * 300.0, "y": (i // 10) * 300.0} for i in range(sites)]
+    document = {
+        "acquisitionEngineProtocol": {
+            "commandId": "cmd-0001",
+            "commandName": "Acquire",
+            "protocolName": "Benchmark Protocol",
+            "protocolVersion": "1.0",
+            "protocolDefinition": {
+                "protocolName": "Benchmark Protocol",
+                "acquisitionName": "Benchmark",
+                "commandSequence": {"commands": [{"name": f"step{i}"} for i in range(50)]},
+                "fileSaveLocation": "D:/Data",
+                "isInteractiveProtocol": False,
+                "mxProtocolFilePath": "D:/Protocols/bench.mxprotocol",
+                "postProcessingOptions": {"shadingCorrection": True},
+                "sendShadingCorrectedImagesToUi": True,
+            },
+            "commandData": {
+                "acquisitionEngineProtocol": {
+                    "commandDefinitions": [
+                        {"id": f"def{i}", "type": "Move", "parameters": {"speed": i}} for i in range(200)
+                    ],
+                    "data": {
+                        "devicePositions": {"stage": {"x": 0, "y": 0}},
+                        "labwareDefinition": {"rows": PLATE_ROWS, "columns": PLATE_COLUMNS},
+                        "siteList": site_list,
+                        "wellList": well_list,
+                    },
+                },
+            },
+        },
+        "uiModel": {
+            "acquisitionName": "Benchmark",
+            "objective": {"name": "20X Plan Apo", "magnification": 20},
+            "cameraName": "Camera",
+            "wellsSitesData": {"wells": [w["name"] for w in well_list], "sites": len(site_list)},
+        },
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+
+
+def image_description(index: int, width: int, height: int, filter_name: str, exposure: float) -> str:
+    """Return a MetaMorph-style ImageDescription with typed <prop> entries"""
+    props = [
+        ("image-name", "string", f"img_{index:08d}"),
+        ("pixel-size-x", "int", width),
+        ("pixel-size-y", "int", height),
+        ("bits-per-pixel", "int", 16),
+        ("exposure-time", "float", exposure),
+        ("spatial-calibration-x", "float", 0.3428),
+        ("spatial-calibration-y", "float", 0.3428),
+        ("stage-position-x", "float", 12130.0 + index),
+        ("stage-position-y", "float", 8990.0 + index),
+        ("z-position", "float", 5200.0),
+        ("camera-binning-x", "int", 1),
+        ("_IllumSetting_", "string", filter_name),
+    ]
+    body = "".join(f'<prop id="{i}" type="{t}" value="{v}"/>' for i, t, v in props)
+    return f"<MetaData><PlaneInfo>{body}</PlaneInfo></MetaData>"
+
+
+def make_tiff(path: str, size: int, pages: int, rng: np.random.Generator, index: int = 0) -> None:
+    """Write a 16-bit TIFF with an XML ImageDescription on every page"""
+    with tifffile.TiffWriter(path) as tif:
+        for page in range(pages):
+            image = rng.integers(0, 65535, (size, size), dtype=np.uint16)
+            description = image_description(
+                index + page, size, size, FILTERS[page % len(FILTERS)], [50.0, 100.0, 200.0, 400.0][page % 4]
+            )
+            tif.write(image, description=description, metadata=None)
+
+
+def generate_dataset(root: str, scale: float, seed: int) -> Dict[str, Any]:
+    """Generate every synthetic input for the given scale and return their paths"""
+    rng = np.random.default_rng(seed)
+    size = max(256, int(1024 * min(scale, 4.0)) // 16 * 16)
+    dataset = {
+        "root": root,
+        "csv": os.path.join(root, "acquisition.csv"),
+        "jdce": os.path.join(root, "plate.jdce"),
+        "protocol": os.path.join(root, "plate.mxprotocol"),
+        "tiff_single": os.path.join(root, "single.tif"),
+        "tiff_multi": os.path.join(root, "multi.tif"),
+        "image_size": size,
+        "scale": scale,
+    }
+    make_csv(dataset["csv"], int(200_000 * scale), rng)
+    make_jdce(dataset["jdce"], int(100_000 * scale), max(4, int(64 * scale)))
+    make_protocol(dataset["protocol"], int(20_000 * scale), int(5_000 * scale))
+    make_tiff(dataset["tiff_single"], size, 1, rng)
+    make_tiff(dataset["tiff_multi"], size, max(2, int(8 * scale)), rng)
+    return dataset
+
+
+# --- Benchmark cases ---
+def bench_csv_reader(dataset):
+    CsvDataReader(dataset["csv"]).read_data()
+
+
+def bench_csv_tail(dataset, chunk_size=64 * 1024):
+    # Replays the CSV as if the acquisition were appending to it, polling after every write
+    with open(dataset["csv"], "rb") as f:
+        data = f.read()
+    live_path = os.path.join(dataset["root"], "live.csv")
+    with open(live_path, "wb") as out:
+        tailer = CsvTailer(live_path)
+        for start in range(0, len(data), chunk_size):
+            out.write(data[start:start + chunk_size])
+            out.flush()
+            tailer.poll()
+    tailer.buffer.to_frame()
+
+
+def bench_jdce_reader(dataset):
+    with open(dataset["jdce"], "rb") as f:
+        JdceDataReader(f).read_data()
+
+
+def bench_protocol_extractor(dataset):
+    with open(dataset["protocol"], encoding="utf-8") as f:
+        # The extractor prints errors and returns None instead of raising
+        if ProtocolDataExtractor().extract_data(f.read()) is None:
+            raise RuntimeError("ProtocolDataExtractor failed on the synthetic protocol")
+
+
+def bench_plate_validation(dataset):
+    if "validation_inputs" not in dataset:
+        with open(dataset["jdce"], "rb") as f:
+            jdce_data = JdceDataReader(f).read_data()
+        dataset["validation_inputs"] = (jdce_data, CsvDataReader(dataset["csv"]).read_data())
+    jdce_data, df = dataset["validation_inputs"]
+    PlateValidator(jdce_data).validate(df)
+
+
+# Copies of the plate uploaded at once by the multi_file_load case
+MULTI_FILE_COPIES = 4
+
+
+def bench_multi_file_load(dataset, copies=MULTI_FILE_COPIES):
+    # Same plate uploaded several times, as in a multi-plate campaign
+    with open(dataset["jdce"], "rb") as f:
+        jdce_bytes = f.read()
+    with open(dataset["csv"], "rb") as f:
+        csv_bytes = f.read()
+    MultiFileLoader().load(
+        [(f"plate{i}.jdce", jdce_bytes) for i in range(copies)],
+        [(f"plate{i}.csv", csv_bytes) for i in range(copies)],
+    )
+
+
+def bench_protocol_diff(dataset):
+    # Trees are built once and cached by the app, so only the diff itself is timed
+    if "diff_trees" not in dataset:
+        with open(dataset["protocol"], encoding="utf-8") as f:
+            old = json.load(f)
+        new = json.loads(json.dumps(old))
+        data = new["acquisitionEngineProtocol"]["commandData"]["acquisitionEngineProtocol"]["data"]
+        data["wellList"][len(data["wellList"]) // 2]["selected"] = False
+        data["siteList"].append({"index": -1, "x": 0.0, "y": 0.0})
+        new["uiModel"]["cameraName"] = "Other Camera"
+        dataset["diff_trees"] = (build_tree(old), build_tree(new))
+    StructuralDiff().diff(*dataset["diff_trees"])
+
+
+def bench_catalog_query(dataset):
+    # Indexing happens once; the timed part is the query the catalog exists to make fast
+    if "catalog" not in dataset:
+        folder = os.path.join(dataset["root"], "catalog")
+        os.makedirs(folder, exist_ok=True)
+        rng = np.random.default_rng(0)
+        for i in range(max(20, int(500 * dataset["scale"]))):
+            make_tiff(os.path.join(folder, f"img_{i:06d}.tif"), 32, 1 + i % 4, rng, index=i)
+        catalog = MetadataCatalog(os.path.join(dataset["root"], "catalog.sqlite"))
+        catalog.update(folder)
+        dataset["catalog"] = catalog
+    dataset["catalog"].query(parse_query("exposure-time > 100 ms and _IllumSetting_ = TRITC"))
+
+
+def bench_tiff_metadata_single(dataset):
+    read_tiff_metadata(dataset["tiff_single"])
+
+
+def bench_tiff_metadata_multi(dataset):
+    read_tiff_metadata(dataset["tiff_multi"])
+
+
+def bench_display_pipeline(dataset):
+    with tifffile.TiffFile(dataset["tiff_single"]) as tif:
+        image = tif.pages[0].asarray()
+    render_preview(image, 1.2, 1.1).tobytes()
+
+
+def bench_full_preview_png(dataset):
+    # What the viewer used to send: the full-resolution image encoded as PNG
+    with tifffile.TiffFile(dataset["tiff_single"]) as tif:
+        image = tif.pages[0].asarray()
+    encode_preview(render_preview(image, 1.2, 1.1), "PNG")
+
+
+def bench_roi_preview_jpeg(dataset, display_width=512):
+    with tifffile.TiffFile(dataset["tiff_single"]) as tif:
+        image = tif.pages[0].asarray()
+    roi = zoom_roi(image.shape, 2.0, 0.4, 0.6)
+    encode_preview(render_roi_preview(image, roi, display_width, 1.2, 1.1), "JPEG")
+
+
+# name -> (function, dataset keys of the files one run processes, summed for throughput).
+# Cases that work on prebuilt structures rather than files report no throughput.
+CASES: Dict[str, Any] = {
+    "csv_reader": (bench_csv_reader, ("csv",)),
+    "csv_tail": (bench_csv_tail, ("csv",)),
+    "jdce_reader": (bench_jdce_reader, ("jdce",)),
+    "protocol_extractor": (bench_protocol_extractor, ("protocol",)),
+    "plate_validation": (bench_plate_validation, ("csv",)),
+    "multi_file_load": (bench_multi_file_load, ("jdce", "csv") * MULTI_FILE_COPIES),
+    "protocol_diff": (bench_protocol_diff, None),
+    "catalog_query": (bench_catalog_query, None),
+    "tiff_metadata_single": (bench_tiff_metadata_single, ("tiff_single",)),
+    "tiff_metadata_multi": (bench_tiff_metadata_multi, ("tiff_multi",)),
+    "display_pipeline": (bench_display_pipeline, ("tiff_single",)),
+    "full_preview_png": (bench_full_preview_png, ("tiff_single",)),
+    "roi_preview_jpeg": (bench_roi_preview_jpeg, ("tiff_single",)),
+}
+
+
+def run_case(func: Callable, dataset: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    """Time a case and measure its peak memory traced by tracemalloc"""
+    func(dataset)  # warm-up
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(dataset)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func(dataset)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "traced_peak_mb": peak / 2**20,
+    }
+
+
+def run_benchmarks(dataset: Dict[str, Any], repeat: int, selected=None) -> Dict[str, Dict[str, float]]:
+    """Run every (or every selected) case and return results keyed by case name"""
+    results = {}
+    for name, (func, input_keys) in CASES.items():
+        if selected and name not in selected:
+            continue
+        result = run_case(func, dataset, repeat)
+        if input_keys:
+            input_mb = sum(os.path.getsize(dataset[key]) for key in input_keys) / 2**20
+            result["input_mb"] = input_mb
+            result["throughput_mb_s"] = input_mb / result["seconds"] if result["seconds"] else float("inf")
+        else:
+            result["input_mb"] = result["throughput_mb_s"] = None
+        results[name] = result
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold: float) -> List[str]:
+    """Return the names of cases slower than baseline by more than the threshold"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base and result["seconds"] > base["seconds"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def print_report(results, baseline=None) -> None:
+    """Print a results table, with the change against baseline when available"""
+    header = f"{'case':<24}{'best s':>10}{'median s':>10}{'MB/s':>10}{'traced peak MB':>16}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        throughput = f"{r['throughput_mb_s']:>10.1f}" if r["throughput_mb_s"] is not None else f"{'n/a':>10}"
+        line = (
+            f"{name:<24}{r['seconds']:>10.4f}{r['median_seconds']:>10.4f}"
+            f"{throughput}{r['traced_peak_mb']:>16.1f}"
+        )
+        if baseline:
+            base = baseline.get("results", {}).get(name)
+            line += f"{(r['seconds'] / base['seconds'] - 1) * 100:>+9.1f}%" if base else f"{'n/a':>10}"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the MXA Analyzer readers and image pipeline.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Dataset scale factor (default: 1.0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic data (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case (default: 5)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Only run the given case(s)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown relative to baseline before failing (default: 0.2)")
+    parser.add_argument("--data-dir", help="Keep generated data in this folder instead of a temp folder")
+    args = parser.parse_args(argv)
+
+    # The readers report errors through Streamlit; keep its bare-mode warnings quiet
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.data_dir or tmp
+        os.makedirs(root, exist_ok=True)
+        print(f"Generating synthetic data (scale={args.scale}, seed={args.seed}) in {root} ...")
+        dataset = generate_dataset(root, args.scale, args.seed)
+        results = run_benchmarks(dataset, args.repeat, args.case)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            # Timings at another scale are not comparable; report without judging regressions
+            print_report(results)
+            print(f"Baseline was recorded at scale {baseline.get('scale')}, not {args.scale}; not comparing")
+            return 1
+
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"scale": args.scale, "seed": args.seed, "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"No regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,8 @@ from tkinter import ttk, filedialog, messagebox, simpledialog
 from PIL import Image, ImageTk, ImageEnhance
 import os
 import logging
-import xml.etree.ElementTree as ET
 from typing import Optional, Dict, Any
-import tifffile
+from tiffMetadata import extract_tiff_metadata
 
 
 class TiffViewer16Bit:
@@ -148,35 +147,7 @@ class TiffViewer16Bit:
 
     def extract_metadata(self) -> Dict[str, Any]:
         """Extract metadata from TIFF file"""
-        try:
-            with tifffile.TiffFile(self.file_path) as tif:
-                metadata = {}
-                for page in tif.pages:
-                    for tag in page.tags.values():
-                        if tag.name == "ImageDescription":
-                            description = tag.value
-                            try:
-                                root = ET.fromstring(description)
-                                for prop in root.findall('.//prop'):
-                                    prop_id = prop.get('id')
-                                    prop_type = prop.get('type')
-                                    prop_value = prop.get('value')
-                                    try:
-                                        if prop_type == "int":
-                                            prop_value = int(prop_value)
-                                        elif prop_type == "float":
-                                            prop_value = float(prop_value)
-                                        metadata[prop_id] = prop_value
-                                    except (ValueError, TypeError):
-                                        self.logger.warning(
-                                            f"Could not convert value '{prop_value}' to type '{prop_type}' for id '{prop_id}'"
-                                        )
-                            except ET.ParseError as e:
-                                self.logger.error(f"XML Parse Error: {e}")
-                return metadata
-        except Exception as e:
-            self.logger.error(f"Error reading TIFF metadata: {e}")
-            return {}
+        return extract_tiff_metadata(self.file_path, self.logger)
 
     def show_metadata_window(self):
         """Display metadata in a new window"""
@@ -0,0 +1,122 @@
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+# Encoded previews kept in memory, keyed by (image hash, ROI, width, window settings, format)
+PREVIEW_CACHE_BYTES = 64 * 2**20
+_preview_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_preview_cache_size = 0
+_preview_cache_lock = threading.Lock()
+
+PREVIEW_FORMATS = {
+    "JPEG": ("JPEG", {"quality": 85}),
+    "PNG": ("PNG", {"compress_level": 1}),
+}
+
+
+def to_8bit(image: np.ndarray) -> np.ndarray:
+    """Scale a 16-bit image array down to 8 bits"""
+    return (image / 256).astype('uint8')
+
+
+def render_preview(image: np.ndarray, brightness: float = 1.0, contrast: float = 1.0) -> Image.Image:
+    """Convert a 16-bit image array to an adjusted 8-bit PIL preview"""
+    pil_img = Image.fromarray(to_8bit(image))
+    pil_img = ImageEnhance.Brightness(pil_img).enhance(brightness)
+    pil_img = ImageEnhance.Contrast(pil_img).enhance(contrast)
+    return pil_img
+
+
+def zoom_roi(shape: Tuple[int, ...], zoom: float, center_x: float = 0.5, center_y: float = 0.5) -> Tuple[int, int, int, int]:
+    """Return the (x0, y0, x1, y1) region shown at a zoom level around a relative center, kept inside the image"""
+    height, width = shape[:2]
+    zoom = max(zoom, 1.0)
+    roi_w = max(1, int(round(width / zoom)))
+    roi_h = max(1, int(round(height / zoom)))
+    x0 = int(round(center_x * width - roi_w / 2))
+    y0 = int(round(center_y * height - roi_h / 2))
+    x0 = min(max(x0, 0), width - roi_w)
+    y0 = min(max(y0, 0), height - roi_h)
+    return x0, y0, x0 + roi_w, y0 + roi_h
+
+
+def block_mean(image: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Shrink an image by an integer factor along its first two axes, averaging each
+    factor x factor block so small bright features survive instead of falling
+    between samples. Trailing axes (RGB samples) are kept. Rows and columns past
+    the last whole block are dropped.
+    """
+    height, width = image.shape[0] // factor, image.shape[1] // factor
+    samples = image.shape[2:]
+    blocks = image[:height * factor, :width * factor]
+    sum_dtype = np.uint32 if factor * factor <= 65536 else np.uint64
+    sums = blocks.reshape(height, factor, width * factor, *samples).sum(axis=1, dtype=sum_dtype)
+    sums = sums.reshape(height, width, factor, *samples).sum(axis=2, dtype=sum_dtype)
+    return (sums // (factor * factor)).astype(image.dtype)
+
+
+def render_roi_preview(image: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None,
+                       display_width: Optional[int] = None, brightness: float = 1.0,
+                       contrast: float = 1.0) -> Image.Image:
+    """
+    Crop a 16-bit image to roi and area-average it down to display_width before the
+    8-bit conversion and adjustments, so only the displayed pixels are processed.
+    """
+    region = image
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        region = image[y0:y1, x0:x1]
+
+    # Whole-block averaging on the 16-bit data, box-filtered to the exact width below;
+    # the factor never exceeds the height, so very wide strips keep at least one row
+    factor = min(region.shape[1] // display_width, region.shape[0]) if display_width else 1
+    if factor >= 2:
+        region = block_mean(region, factor)
+
+    pil_img = Image.fromarray(to_8bit(region))
+    # Crops narrower than display_width stay at native resolution; the browser scales them
+    if display_width and pil_img.width > display_width:
+        height = max(1, int(round(pil_img.height * display_width / pil_img.width)))
+        pil_img = pil_img.resize((display_width, height), Image.Resampling.BOX)
+
+    pil_img = ImageEnhance.Brightness(pil_img).enhance(brightness)
+    pil_img = ImageEnhance.Contrast(pil_img).enhance(contrast)
+    return pil_img
+
+
+def encode_preview(pil_img: Image.Image, fmt: str = "JPEG") -> bytes:
+    """Encode a preview with a fast encoder setting"""
+    pil_format, options = PREVIEW_FORMATS[fmt]
+    buffer = io.BytesIO()
+    pil_img.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def cached_preview(image_key, image: np.ndarray, roi=None, display_width: Optional[int] = None,
+                   brightness: float = 1.0, contrast: float = 1.0, fmt: str = "JPEG") -> bytes:
+    """
+    Return the encoded preview for an image region, reusing it when the same
+    image hash, ROI, width, window settings and format were rendered before.
+    """
+    global _preview_cache_size
+    key = (image_key, tuple(roi) if roi else None, display_width, brightness, contrast, fmt)
+    with _preview_cache_lock:
+        data = _preview_cache.get(key)
+        if data is not None:
+            _preview_cache.move_to_end(key)
+            return data
+
+    data = encode_preview(render_roi_preview(image, roi, display_width, brightness, contrast), fmt)
+    with _preview_cache_lock:
+        if key not in _preview_cache:
+            _preview_cache[key] = data
+            _preview_cache_size += len(data)
+        while _preview_cache_size > PREVIEW_CACHE_BYTES and len(_preview_cache) > 1:
+            _, evicted = _preview_cache.popitem(last=False)
+            _preview_cache_size -= len(evicted)
+    return data
@@ -0,0 +1,324 @@
+import io
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from CsvDataReader import CsvDataReader
+from tiffMetadata import read_tiff_page_metadata
+
+logger = logging.getLogger(__name__)
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+
+class ColumnarBuffer:
+    """
+    Appendable column store backed by growable numpy arrays.
+
+    Appends are amortised O(rows appended): each column doubles its capacity
+    when full, so long acquisitions never re-copy the whole table per update.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.initial_capacity = initial_capacity
+        self._columns: Dict[str, np.ndarray] = {}
+        self._size = 0
+        self._capacity = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def clear(self):
+        """Drop all rows and columns"""
+        with self._lock:
+            self._columns = {}
+            self._size = 0
+            self._capacity = 0
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self._capacity * 2, self.initial_capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def _new_column(self, dtype: np.dtype) -> np.ndarray:
+        """Create a column for a name first seen after rows were already buffered"""
+        if dtype.kind in "biuf":
+            column = np.full(self._capacity, np.nan, dtype=np.float64)
+        else:
+            column = np.full(self._capacity, None, dtype=object)
+        return column
+
+    def append(self, df: pd.DataFrame):
+        """Append the rows of a DataFrame, promoting column dtypes as needed"""
+        rows = len(df)
+        if not rows:
+            return
+        with self._lock:
+            needed = self._size + rows
+            if needed > self._capacity:
+                self._grow(needed)
+
+            for name in df.columns:
+                values = df[name].to_numpy()
+                if values.dtype.kind not in "biuf":
+                    values = values.astype(object)
+                column = self._columns.get(name)
+                if column is None:
+                    column = self._new_column(values.dtype) if self._size else np.empty(self._capacity, values.dtype)
+                if column.dtype != values.dtype:
+                    if column.dtype == object or values.dtype == object:
+                        dtype = np.dtype(object)
+                    else:
+                        dtype = np.result_type(column.dtype, values.dtype)
+                    if column.dtype != dtype:
+                        column = column.astype(dtype)
+                column[self._size:needed] = values
+                self._columns[name] = column
+
+            # Columns missing from this chunk are filled with NaN/None
+            for name, column in self._columns.items():
+                if name in df.columns:
+                    continue
+                if column.dtype.kind in "biu":
+                    column = column.astype(np.float64)
+                column[self._size:needed] = np.nan if column.dtype.kind == "f" else None
+                self._columns[name] = column
+
+            self._size = needed
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the buffered rows as a DataFrame without copying the columns"""
+        with self._lock:
+            # Views stay valid: later appends only write past _size or into new arrays
+            data = {name: column[:self._size] for name, column in self._columns.items()}
+        return pd.DataFrame(data, copy=False)
+
+
+class CsvTailer:
+    """
+    Tails an acquisition CSV by byte offset, parsing only newly appended complete rows.
+    """
+
+    def __init__(self, path: str, buffer: Optional[ColumnarBuffer] = None):
+        self.path = path
+        self.buffer = buffer or ColumnarBuffer()
+        self.offset = 0
+        self.header: Optional[bytes] = None
+        # Why the file is skipped, e.g. a summary export without the acquisition columns
+        self.rejected: Optional[str] = None
+
+    def reset(self):
+        """Start over, e.g. after the file was truncated or replaced"""
+        self.offset = 0
+        self.header = None
+        self.rejected = None
+        self.buffer.clear()
+
+    def poll(self) -> int:
+        """
+        Parses rows appended since the last poll and returns how many were added.
+        A trailing partial row is left for the next poll.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            logger.info(f"{self.path} shrank, re-reading from the start")
+            self.reset()
+        if self.rejected:
+            # Only the header is re-read, to notice the file being replaced
+            with open(self.path, "rb") as f:
+                if f.read(len(self.header)) == self.header:
+                    return 0
+            self.reset()
+        if size == self.offset:
+            return 0
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return 0
+        complete = chunk[:end + 1]
+
+        header = self.header
+        if header is None:
+            newline = complete.find(b"\n")
+            header, complete = complete[:newline + 1], complete[newline + 1:]
+
+        if complete.strip():
+            df = pd.read_csv(io.BytesIO(header + complete))
+            try:
+                df = CsvDataReader.reorder_columns(df)
+            except ValueError as e:
+                # Not an acquisition CSV; skipped until it is truncated or replaced
+                self.rejected = str(e)
+                self.header = header
+                logger.warning(f"Skipping {self.path}, missing acquisition column {e}")
+                return 0
+            self.buffer.append(df)
+            rows = len(df)
+        else:
+            rows = 0
+
+        # Only advance once the rows are safely buffered
+        self.header = header
+        self.offset += end + 1
+        return rows
+
+
+class LiveIngestor(FileSystemEventHandler):
+    """
+    Watches an acquisition output folder, tailing CSVs and extracting TIFF metadata as files land.
+    """
+
+    def __init__(self, folder: str, recursive: bool = True):
+        super().__init__()
+        self.folder = folder
+        self.recursive = recursive
+        self.tailers: Dict[str, CsvTailer] = {}
+        # Props of each plane, in page order, per TIFF path
+        self.image_metadata: Dict[str, List[Dict[str, Any]]] = {}
+        self._tiff_stamps: Dict[str, Tuple[int, int]] = {}
+        self.version = 0
+        self._pending_tiffs = set()
+        self._lock = threading.Lock()
+        self._observer = None
+
+    @property
+    def running(self) -> bool:
+        return self._observer is not None and self._observer.is_alive()
+
+    def start(self):
+        """Ingest files already in the folder, then start watching for changes"""
+        if self.running:
+            return
+        for root, _, files in os.walk(self.folder):
+            for name in sorted(files):
+                self.handle_path(os.path.join(root, name))
+            if not self.recursive:
+                break
+        self._observer = Observer()
+        self._observer.schedule(self, self.folder, recursive=self.recursive)
+        self._observer.daemon = True
+        self._observer.start()
+        logger.info(f"Watching {self.folder}")
+
+    def stop(self):
+        """Stop watching the folder"""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    # --- watchdog callbacks ---
+    def on_created(self, event):
+        if not event.is_directory:
+            self.handle_path(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.handle_path(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.handle_path(event.dest_path)
+
+    def handle_path(self, path: str):
+        """Ingest whatever is new in the given file"""
+        path = os.fsdecode(path)
+        extension = os.path.splitext(path)[1].lower()
+        with self._lock:
+            try:
+                if extension == ".csv":
+                    tailer = self.tailers.get(path)
+                    if tailer is None:
+                        tailer = self.tailers[path] = CsvTailer(path)
+                    if tailer.poll():
+                        self.version += 1
+                elif extension in TIFF_EXTENSIONS:
+                    self._ingest_tiff(path)
+            except Exception as e:
+                logger.error(f"Error ingesting {path}: {e}")
+
+    def _ingest_tiff(self, path: str):
+        """Reads the pages appended to a TIFF since its size or mtime last changed"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Deleted, e.g. a temporary file; stop retrying it
+            self._pending_tiffs.discard(path)
+            return
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        previous = self._tiff_stamps.get(path)
+        if previous == stamp:
+            return
+        pages = self.image_metadata.get(path, [])
+        if previous is not None and stamp[0] < previous[0]:
+            # Shrunk, so it was replaced rather than appended to
+            pages = []
+        try:
+            new_pages = read_tiff_page_metadata(path, logger, start=len(pages))
+        except Exception:
+            # Most likely still being written; retried on the next event or poll
+            self._pending_tiffs.add(path)
+            return
+        self._pending_tiffs.discard(path)
+        self._tiff_stamps[path] = stamp
+        if new_pages or path not in self.image_metadata:
+            self.image_metadata[path] = pages + new_pages
+            self.version += 1
+
+    def poll(self):
+        """Catch up on anything watchdog events may have missed"""
+        with self._lock:
+            paths = list(self.tailers) + list(self._pending_tiffs)
+        for path in paths:
+            self.handle_path(path)
+
+    def row_count(self) -> int:
+        """Number of CSV rows tailed so far"""
+        with self._lock:
+            return sum(len(t.buffer) for t in self.tailers.values())
+
+    def image_count(self) -> int:
+        """Number of TIFF files with extracted metadata"""
+        with self._lock:
+            return len(self.image_metadata)
+
+    def csv_frame(self) -> Optional[pd.DataFrame]:
+        """Return all rows tailed so far, or None if nothing has arrived yet"""
+        with self._lock:
+            frames = [t.buffer.to_frame() for t in self.tailers.values() if len(t.buffer)]
+        if not frames:
+            return None
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def metadata_frame(self) -> Optional[pd.DataFrame]:
+        """Return the extracted TIFF metadata, one row per image plane"""
+        with self._lock:
+            rows = [
+                {'Path': path, 'Page': page, **metadata}
+                for path, pages in self.image_metadata.items()
+                for page, metadata in enumerate(pages)
+            ]
+        if not rows:
+            return None
+        return pd.DataFrame(rows)
@@ -1,12 +1,18 @@
 import streamlit as st
 from st_aggrid import AgGrid, GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode
-from CsvDataReader import CsvDataReader
-from JdceDataReader import JdceDataReader
 from protocol import ProtocolDataExtractor
+from liveIngest import LiveIngestor
+from multiFileLoader import MultiFileLoader
+from plateValidation import PlateValidator, VALIDATION_COLUMNS, validate_by_source
+from structuralDiff import StructuralDiff, tree_from_bytes, tree_from_file, compare_to_directory
+from metadataCatalog import MetadataCatalog, parse_query, DEFAULT_CATALOG_NAME
+import json
+import os
 import pandas as pd
-from PIL import Image, ImageEnhance
+from imageDisplay import cached_preview, zoom_roi, PREVIEW_FORMATS
 import tifffile
+import hashlib
 import io
 import xml.etree.ElementTree as ET
 
@@ -19,19 +25,34 @@ st.set_page_config(
 )
 
 # --- Initialize Session State ---
-if "jdce_file" not in st.session_state:
-    st.session_state.jdce_file = None
+if "jdce_files" not in st.session_state:
+    st.session_state.jdce_files = []
+    st.session_state.jdce_datasets = {}
     st.session_state.jdce_data = None
 
-if "csv_file" not in st.session_state:
-    st.session_state.csv_file = None
+if "csv_files" not in st.session_state:
+    st.session_state.csv_files = []
     st.session_state.csv_data = None
 
+if "upload_signature" not in st.session_state:
+    st.session_state.upload_signature = ()
+
 if "tiff_file" not in st.session_state:
     st.session_state.tiff_file = None
     st.session_state.tiff_metadata = None
     st.session_state.tiff_image = None
 
+if "live_ingestor" not in st.session_state:
+    st.session_state.live_ingestor = None
+    st.session_state.live_version = 0
+    st.session_state.live_csv_data = None
+
+if "csv_source_signature" not in st.session_state:
+    st.session_state.csv_source_signature = None
+
+if "validation_result" not in st.session_state:
+    st.session_state.validation_result = None
+
 if "protocol_file" not in st.session_state:
     st.session_state.protocol_file = None
     st.session_state.protocol_data = None
@@ -48,23 +69,41 @@ def tiff_viewer_page():
 
     if st.session_state.tiff_file:
         try:
-            tiff_bytes = st.session_state.tiff_file.read()
-            with tifffile.TiffFile(io.BytesIO(tiff_bytes)) as tif:
-                image = tif.pages[0].asarray()
-                metadata_raw = tif.pages[0].tags.get("ImageDescription")
-                description = metadata_raw.value if metadata_raw else None
-
-            image_8bit = (image / 256).astype('uint8')
-            pil_img = Image.fromarray(image_8bit)
+            # Decode and hash each upload once, not on every rerun
+            file_id = st.session_state.tiff_file.file_id
+            if st.session_state.tiff_image is None or st.session_state.tiff_image[0] != file_id:
+                tiff_bytes = st.session_state.tiff_file.getvalue()
+                with tifffile.TiffFile(io.BytesIO(tiff_bytes)) as tif:
+                    image = tif.pages[0].asarray()
+                    metadata_raw = tif.pages[0].tags.get("ImageDescription")
+                    description = metadata_raw.value if metadata_raw else None
+                image_hash = hashlib.blake2b(tiff_bytes, digest_size=16).hexdigest()
+                st.session_state.tiff_image = (file_id, image_hash, image)
+                st.session_state.tiff_metadata = description
+            _, image_hash, image = st.session_state.tiff_image
+            description = st.session_state.tiff_metadata
 
             st.sidebar.markdown("### 🔧 Adjustments")
             brightness = st.sidebar.slider("Brightness", 0.1, 2.0, 1.0)
             contrast = st.sidebar.slider("Contrast", 0.1, 2.0, 1.0)
 
-            pil_img = ImageEnhance.Brightness(pil_img).enhance(brightness)
-            pil_img = ImageEnhance.Contrast(pil_img).enhance(contrast)
+            st.sidebar.markdown("### 🔍 Zoom & Region")
+            zoom = st.sidebar.slider("Zoom", 1.0, 16.0, 1.0, step=0.5)
+            center_x = st.sidebar.slider("Center X (%)", 0, 100, 50, disabled=zoom == 1.0)
+            center_y = st.sidebar.slider("Center Y (%)", 0, 100, 50, disabled=zoom == 1.0)
+            display_width = st.sidebar.select_slider("Display Width (px)", options=[512, 768, 1024, 1536, 2048], value=1024)
+            preview_format = st.sidebar.radio("Preview Encoding", list(PREVIEW_FORMATS), horizontal=True)
+
+            roi = zoom_roi(image.shape, zoom, center_x / 100, center_y / 100)
+            preview = cached_preview(
+                image_hash, image, roi, display_width, brightness, contrast, preview_format
+            )
 
-            st.image(pil_img, use_column_width=True, caption="TIFF Preview")
+            x0, y0, x1, y1 = roi
+            st.image(
+                preview, use_column_width=True,
+                caption=f"TIFF Preview — region ({x0}, {y0})–({x1}, {y1}) of {image.shape[1]}×{image.shape[0]}"
+            )
 
             if description:
                 try:
@@ -78,34 +117,155 @@ def tiff_viewer_page():
             st.error(f"Failed to process TIFF: {e}")
 
 
+# --- LIVE ACQUISITION ---
+LIVE_REFRESH_SECONDS = 2
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_status_fragment():
+    ingestor = st.session_state.live_ingestor
+    if ingestor is None or not ingestor.running:
+        return
+    ingestor.poll()
+    st.caption(f"📡 Watching {ingestor.folder} — {ingestor.row_count()} rows, {ingestor.image_count()} images")
+    if ingestor.version != st.session_state.live_version:
+        st.session_state.live_version = ingestor.version
+        st.rerun()
+
+
+def live_acquisition_panel():
+    with st.expander("📡 Live Acquisition", expanded=st.session_state.live_ingestor is not None):
+        folder = st.text_input("Acquisition output folder", placeholder="D:/Data/Plate001")
+        start_col, stop_col = st.columns(2)
+        with start_col:
+            if st.button("▶️ Start Watching", disabled=not folder):
+                if st.session_state.live_ingestor is not None:
+                    st.session_state.live_ingestor.stop()
+                try:
+                    ingestor = LiveIngestor(folder)
+                    ingestor.start()
+                    st.session_state.live_ingestor = ingestor
+                    st.session_state.live_version = -1
+                    st.session_state.live_csv_data = None
+                except Exception as e:
+                    st.error(f"Could not watch folder: {e}")
+        with stop_col:
+            if st.button("⏹️ Stop Watching", disabled=st.session_state.live_ingestor is None):
+                st.session_state.live_ingestor.stop()
+                st.session_state.live_ingestor = None
+
+        live_status_fragment()
+
+    ingestor = st.session_state.live_ingestor
+    if ingestor is not None:
+        live_df = ingestor.csv_frame()
+        if live_df is not None:
+            st.session_state.live_csv_data = live_df
+        metadata_df = ingestor.metadata_frame()
+        if metadata_df is not None:
+            with st.expander(f"🧬 Live Image Metadata ({len(metadata_df)} planes)"):
+                st.dataframe(metadata_df, use_container_width=True)
+
+
+# --- MULTI-FILE UPLOAD ---
+def load_uploaded_files(jdce_files, csv_files):
+    # Only re-parse when the set of uploaded files changes, not on every rerun
+    signature = tuple(f.file_id for f in jdce_files) + (None,) + tuple(f.file_id for f in csv_files)
+    if signature == st.session_state.upload_signature:
+        return
+    st.session_state.upload_signature = signature
+    # JDCE and CSV state always describe the same set of uploads, so provenance
+    # and validation never refer to plates that were removed
+    st.session_state.jdce_files = jdce_files
+    st.session_state.jdce_datasets = {}
+    st.session_state.jdce_data = None
+    st.session_state.csv_files = csv_files
+    st.session_state.csv_data = None
+    st.session_state.validation_result = None
+    if not jdce_files and not csv_files:
+        return
+
+    progress_bar = st.progress(0.0, text="Parsing uploaded files...")
+
+    def report_progress(done, total, name):
+        progress_bar.progress(done / total, text=f"Parsed {name} ({done}/{total})")
+
+    loader = MultiFileLoader()
+    jdce_datasets, merged, failed = loader.load(
+        [(f.name, f.getvalue()) for f in jdce_files],
+        [(f.name, f.getvalue()) for f in csv_files],
+        report_progress
+    )
+    progress_bar.empty()
+    for name, error in failed:
+        st.error(f"An error occurred while processing {name}: {error}")
+
+    st.session_state.jdce_datasets = jdce_datasets
+    st.session_state.jdce_data = next(iter(jdce_datasets.values()), None)
+    st.session_state.csv_data = merged
+
+
+# --- CSV SOURCE ---
+UPLOAD_SOURCE = "📊 Uploaded CSV files"
+LIVE_SOURCE = "📡 Live acquisition"
+
+
+def active_csv_data():
+    """Returns the CSV data to analyse, letting the user pick when both uploads and live data exist"""
+    sources = {}
+    if st.session_state.csv_data is not None:
+        sources[UPLOAD_SOURCE] = (st.session_state.csv_data, st.session_state.upload_signature)
+    if st.session_state.live_csv_data is not None:
+        sources[LIVE_SOURCE] = (st.session_state.live_csv_data, st.session_state.live_version)
+    if not sources:
+        return None
+
+    if len(sources) > 1:
+        source = st.radio("CSV data source", options=list(sources), horizontal=True, key="csv_source")
+    else:
+        source = next(iter(sources))
+        st.caption(f"CSV data source: {source}")
+
+    # Results computed on another source, or on an older version of this one, no longer apply
+    data, version = sources[source]
+    if st.session_state.csv_source_signature != (source, version):
+        st.session_state.csv_source_signature = (source, version)
+        st.session_state.validation_result = None
+    return data
+
+
 # --- MXA ANALYZER PAGE ---
 def main_analyzer_page():
     st.title("🔬 MXA Data Analyzer")
 
     col1, col2 = st.columns(2)
     with col1:
-        with st.expander("📁 Upload JDCE File", expanded=True):
-            jdce_file = st.file_uploader("Select .jdce file", type=["jdce"], label_visibility="collapsed")
-            if jdce_file:
-                st.session_state.jdce_file = jdce_file
-                reader = JdceDataReader(jdce_file)
-                st.session_state.jdce_data = reader.extract_data()
+        with st.expander("📁 Upload JDCE Files", expanded=True):
+            jdce_files = st.file_uploader(
+                "Select .jdce files", type=["jdce"], accept_multiple_files=True, label_visibility="collapsed"
+            )
 
     with col2:
-        with st.expander("📊 Upload CSV File", expanded=True):
-            csv_file = st.file_uploader("Select .csv file", type=["csv"], label_visibility="collapsed")
-            if csv_file:
-                st.session_state.csv_file = csv_file
-                reader = CsvDataReader(csv_file)
-                st.session_state.csv_data = reader.extract_data()
-
-    if st.session_state.jdce_data or st.session_state.csv_data:
+        with st.expander("📊 Upload CSV Files", expanded=True):
+            csv_files = st.file_uploader(
+                "Select .csv files", type=["csv"], accept_multiple_files=True, label_visibility="collapsed"
+            )
+
+    load_uploaded_files(jdce_files or [], csv_files or [])
+
+    live_acquisition_panel()
+
+    csv_data = active_csv_data()
+    if st.session_state.jdce_data or csv_data is not None:
         st.markdown("---")
         col1, col2 = st.columns(2)
 
         if st.session_state.jdce_data:
             with col1:
                 st.markdown("### 📄 JDCE Data Analysis")
+                if len(st.session_state.jdce_datasets) > 1:
+                    selected_jdce = st.selectbox("Select Plate:", options=list(st.session_state.jdce_datasets))
+                    st.session_state.jdce_data = st.session_state.jdce_datasets[selected_jdce]
                 for category, data in st.session_state.jdce_data.items():
                     with st.expander(f"📂 {category}"):
                         if isinstance(data, (dict, list)):
@@ -114,10 +274,10 @@ def main_analyzer_page():
                         else:
                             st.write(data)
 
-        if st.session_state.csv_data is not None:
+        if csv_data is not None:
             with col2:
                 st.markdown("### 📈 CSV Data Analysis")
-                df = st.session_state.csv_data
+                df = csv_data
 
                 gb = GridOptionsBuilder.from_dataframe(df)
                 gb.configure_pagination()
@@ -156,6 +316,59 @@ def main_analyzer_page():
                         mime="text/csv"
                     )
 
+    if st.session_state.jdce_data and csv_data is not None:
+        position_validation_panel(csv_data)
+
+
+def position_validation_panel(csv_data):
+    st.markdown("---")
+    st.markdown("### 🎯 Position Validation")
+    if st.button("Validate CSV positions against JDCE plate geometry"):
+        try:
+            jdce_datasets = st.session_state.jdce_datasets
+            if 'SourceFile' in csv_data.columns and jdce_datasets:
+                # Merged uploads: each CSV is checked against the plate it was matched to
+                jdce_names = list(jdce_datasets)
+                jdce_by_source = {}
+                for source in csv_data['SourceFile'].unique():
+                    jdce_name = MultiFileLoader.match_jdce(str(source), jdce_names)
+                    jdce_by_source[source] = jdce_datasets.get(jdce_name)
+                st.session_state.validation_result = validate_by_source(csv_data, jdce_by_source)
+            else:
+                validator = PlateValidator(st.session_state.jdce_data)
+                st.session_state.validation_result = validator.validate(csv_data)
+        except Exception as e:
+            st.session_state.validation_result = None
+            st.error(f"An error occurred while validating positions: {e}")
+
+    if st.session_state.validation_result is None:
+        return
+
+    annotated, summary = st.session_state.validation_result
+    metric_cols = st.columns(5)
+    metric_cols[0].metric("Valid Rows", f"{summary['Valid Rows']} / {summary['Rows Checked']}")
+    metric_cols[1].metric("Invalid Wells", summary['Invalid Well Names'])
+    metric_cols[2].metric("Outside Well", summary['Outside Well'])
+    metric_cols[3].metric("Duplicate Positions", summary['Duplicate Positions'])
+    metric_cols[4].metric("Unknown Channel Rows", summary['Unknown Channel Rows'])
+    if summary['Unknown Channels']:
+        st.warning(f"⚠️ Channels missing from JDCE Wavelength Settings: {', '.join(summary['Unknown Channels'])}")
+    if summary.get('Sources Without JDCE'):
+        st.warning(f"⚠️ Not validated, no matching JDCE file: {', '.join(summary['Sources Without JDCE'])}")
+    if summary['Field Exceeds Well']:
+        st.info(f"ℹ️ {summary['Field Exceeds Well']} images have a field of view extending past the well edge.")
+
+    invalid = annotated[~annotated['Valid']]
+    with st.expander(f"📋 Invalid Rows ({len(invalid)})", expanded=bool(len(invalid))):
+        columns = ['ImageFileName', 'Well', 'PositionXUm', 'PositionYUm', 'ExcitationEmissionFilter'] + VALIDATION_COLUMNS
+        st.dataframe(invalid[[c for c in columns if c in invalid.columns]], use_container_width=True)
+        st.download_button(
+            label="📥 Download Invalid Rows",
+            data=invalid.to_csv(index=False).encode('utf-8'),
+            file_name="invalid_positions.csv",
+            mime="text/csv"
+        )
+
 
 # --- PROTOCOL VIEWER PAGE ---
 def protocol_data_page():
@@ -178,12 +391,158 @@ def protocol_data_page():
                 else:
                     st.write(data)
 
+    compare_files_panel()
+
+
+# --- STRUCTURAL DIFF ---
+MAX_DIFF_CHANGES = 5000
+
+
+def changes_to_frame(changes):
+    def preview(value):
+        if value is None:
+            return ""
+        text = json.dumps(value, default=str)
+        return text if len(text) <= 200 else text[:197] + "..."
+
+    return pd.DataFrame(
+        [(c['op'], c['path'], preview(c['old']), preview(c['new'])) for c in changes],
+        columns=["Change", "Path", "Old", "New"]
+    )
+
+
+def show_changes(changes):
+    if not changes:
+        st.success("✅ No differences found.")
+        return
+    counts = pd.Series([c['op'] for c in changes]).value_counts()
+    metric_cols = st.columns(4)
+    for col, op in zip(metric_cols, ("added", "removed", "changed", "moved")):
+        col.metric(op.capitalize(), int(counts.get(op, 0)))
+    if len(changes) >= MAX_DIFF_CHANGES:
+        st.warning(f"⚠️ Showing the first {MAX_DIFF_CHANGES} changes only.")
+    st.dataframe(changes_to_frame(changes), use_container_width=True)
+
+
+def compare_files_panel():
+    st.markdown("---")
+    st.markdown("### 🔀 Compare Files")
+    compare_col1, compare_col2 = st.columns(2)
+    with compare_col1:
+        base_file = st.file_uploader(
+            "Base file (defaults to the protocol above)", type=["mxprotocol", "jdce"], key="compare_base"
+        )
+    with compare_col2:
+        other_file = st.file_uploader("Compare with", type=["mxprotocol", "jdce"], key="compare_other")
+    directory = st.text_input("Or compare the base file against every .mxprotocol/.jdce in a folder")
+
+    base_file = base_file or st.session_state.protocol_file
+    if not base_file:
+        st.info("ℹ️ Upload a protocol above or a base file here to compare.")
+        return
+
+    try:
+        base_tree = tree_from_bytes(base_file.getvalue())
+        if other_file:
+            st.markdown(f"#### {base_file.name} → {other_file.name}")
+            changes = StructuralDiff(MAX_DIFF_CHANGES).diff(base_tree, tree_from_bytes(other_file.getvalue()))
+            show_changes(changes)
+
+        if directory:
+            results = compare_to_directory(base_tree, directory)
+            if not results:
+                st.warning("⚠️ No .mxprotocol or .jdce files found in that folder.")
+                return
+            st.markdown(f"#### {base_file.name} vs {len(results)} files in {directory}")
+            st.dataframe(
+                pd.DataFrame(results, columns=["File", "Changes", "Identical"]), use_container_width=True
+            )
+            selected_path = st.selectbox("Show changes for:", options=[r[0] for r in results])
+            changes = StructuralDiff(MAX_DIFF_CHANGES).diff(base_tree, tree_from_file(selected_path))
+            show_changes(changes)
+    except Exception as e:
+        st.error(f"An error occurred while comparing files: {e}")
+
+
+# --- METADATA CATALOG PAGE ---
+MAX_CATALOG_RESULTS = 10000
+
+
+def metadata_catalog_page():
+    st.title("🗂️ Metadata Catalog")
+
+    root = st.text_input("Image folder to index", placeholder="D:/Data/Plate001")
+    if not root:
+        st.info("ℹ️ Enter a folder containing TIFF images.")
+        return
+    if not os.path.isdir(root):
+        st.error(f"Folder not found: {root}")
+        return
+
+    # The data folder may be read-only, so the catalog can live elsewhere
+    catalog_path = st.text_input(
+        "Catalog file", value=os.path.join(root, DEFAULT_CATALOG_NAME),
+        help="SQLite file holding the index; choose a writable location if the image folder is read-only."
+    )
+    try:
+        catalog = MetadataCatalog(catalog_path)
+    except Exception as e:
+        st.error(f"Could not open catalog {catalog_path}: {e}")
+        return
+    if st.button("🔄 Index / Update Catalog"):
+        progress_bar = st.progress(0.0, text="Indexing images...")
+
+        def report_progress(done, total, name):
+            progress_bar.progress(done / total, text=f"Indexed {os.path.basename(name)} ({done}/{total})")
+
+        try:
+            result = catalog.update(root, report_progress)
+            progress_bar.empty()
+            st.success(
+                f"✅ {result['Indexed']} indexed, {result['Unchanged']} unchanged, {result['Removed']} removed."
+            )
+            for path, error in result['Failed']:
+                st.warning(f"⚠️ Could not read {path}: {error}")
+        except Exception as e:
+            progress_bar.empty()
+            st.error(f"An error occurred while indexing images: {e}")
+
+    st.caption(f"{catalog.file_count()} images in catalog")
+    prop_ids = catalog.prop_ids()
+    if not prop_ids:
+        return
+
+    query_text = st.text_input(
+        "Query (e.g. exposure-time > 200 and _IllumSetting_ = FITC)",
+        help="Conditions joined by 'and'. Operators: = != > >= < <= and ~ (text contains)."
+    )
+    shown_props = st.multiselect("Columns to show", options=prop_ids)
+    try:
+        planes = catalog.query(parse_query(query_text), limit=MAX_CATALOG_RESULTS) if query_text else []
+    except Exception as e:
+        st.error(f"Invalid query: {e}")
+        return
+    if query_text:
+        image_count = len({path for path, _ in planes})
+        st.markdown(f"### 🔍 {len(planes)} matching planes in {image_count} images")
+        if len(planes) >= MAX_CATALOG_RESULTS:
+            st.warning(f"⚠️ Showing the first {MAX_CATALOG_RESULTS} matches only.")
+        results = catalog.props_frame(planes, shown_props or None)
+        st.dataframe(results, use_container_width=True)
+        st.download_button(
+            label="📥 Download Results",
+            data=results.to_csv(index=False).encode('utf-8'),
+            file_name="catalog_query.csv",
+            mime="text/csv"
+        )
+
 
 # --- SIDEBAR NAVIGATION ---
 page_names_to_funcs = {
     "🔬 MXA Analyzer": main_analyzer_page,
     "🖼️ TIFF Viewer": tiff_viewer_page,
     "⚙️ Protocol Data": protocol_data_page,
+    "🗂️ Metadata Catalog": metadata_catalog_page,
 }
 
 with st.sidebar:
@@ -0,0 +1,265 @@
+"""
+Queryable catalog of TIFF ImageDescription props.
+
+Every TIFF under a root folder is indexed once into SQLite. Each
+<prop id type value> of each page becomes a row that keeps the page number, the
+text value and, when the value is numeric, its number. Values are indexed per
+prop id, so a query like "exposure-time > 200 and _IllumSetting_ = FITC" is
+answered from the indexes instead of opening every file, and matches the
+individual planes of multi-page stacks. Re-indexing only re-reads files whose
+size or mtime changed.
+"""
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from tiffMetadata import read_tiff_page_metadata
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+DEFAULT_CATALOG_NAME = ".mxa_catalog.sqlite"
+
+# Leading number of string props such as "200 ms", so they can be compared numerically
+NUMBER_PREFIX = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+CONDITION_PATTERN = re.compile(r"^\s*(\S+)\s*(>=|<=|!=|=|>|<|~)\s*(.+?)\s*$")
+NUMERIC_OPERATORS = {'=': '=', '!=': '!=', '>': '>', '>=': '>=', '<': '<', '<=': '<='}
+
+# Bumped whenever the tables change; older catalogs are rebuilt, they only cache what is on disk
+SCHEMA_VERSION = 2
+# Stored in the SQLite header so only files this module created are ever rebuilt ("MXAC")
+APPLICATION_ID = 0x4D584143
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS props (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    prop_id TEXT NOT NULL,
+    value_text TEXT,
+    value_num REAL,
+    value_type TEXT
+);
+CREATE INDEX IF NOT EXISTS props_num ON props (prop_id, value_num);
+CREATE INDEX IF NOT EXISTS props_text ON props (prop_id, value_text);
+CREATE INDEX IF NOT EXISTS props_file ON props (file_id, page);
+"""
+
+
+def prop_rows(metadata: Dict[str, Any]) -> List[Tuple[str, Optional[str], Optional[float], str]]:
+    """Turns typed props into (prop_id, value_text, value_num, value_type) rows"""
+    rows = []
+    for prop_id, value in metadata.items():
+        if isinstance(value, bool) or value is None:
+            number = None
+        elif isinstance(value, (int, float)):
+            number = float(value)
+        else:
+            match = NUMBER_PREFIX.match(str(value))
+            number = float(match.group(1)) if match else None
+        rows.append((prop_id, None if value is None else str(value), number, type(value).__name__))
+    return rows
+
+
+def index_file(path: str) -> Tuple[str, Optional[list], Optional[str]]:
+    """Reads one TIFF's props as (page, prop_id, ...) rows; module level so process pools can pickle it"""
+    try:
+        rows = [
+            (page,) + row
+            for page, metadata in enumerate(read_tiff_page_metadata(path))
+            for row in prop_rows(metadata)
+        ]
+        return path, rows, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def parse_query(text: str) -> List[Tuple[str, str, str]]:
+    """
+    Parses "prop op value [and prop op value ...]" into (prop_id, op, value) conditions.
+    Operators are = != > >= < <= and ~ (text contains).
+    """
+    conditions = []
+    for part in re.split(r"\s+and\s+", text.strip(), flags=re.IGNORECASE):
+        if not part:
+            continue
+        match = CONDITION_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Could not parse condition '{part}'")
+        conditions.append(match.groups())
+    return conditions
+
+
+class MetadataCatalog:
+    """
+    SQLite catalog of TIFF metadata props, updated incrementally by file size and mtime.
+    """
+
+    def __init__(self, db_path: str, max_workers: Optional[int] = None, use_processes: bool = True):
+        """
+        Initializes MetadataCatalog. Parsing the XML holds the GIL, so files are
+        indexed in a process pool by default. Raises ValueError if db_path is an
+        SQLite database that is not a catalog, rather than touching its tables.
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        with self._connect() as conn:
+            application_id = conn.execute("PRAGMA application_id").fetchone()[0]
+            has_tables = conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] > 0
+            if has_tables and application_id != APPLICATION_ID:
+                raise ValueError(f"{db_path} is an existing database, not a metadata catalog")
+            if has_tables and conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS props; DROP TABLE IF EXISTS files;")
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # The default rollback journal is kept; WAL does not work on network shares
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def update(self, root: str, progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+        """
+        Indexes new and changed TIFFs under root and drops deleted ones.
+        Returns counts of indexed, unchanged, removed and failed files.
+        """
+        on_disk = {}
+        for folder, _, files in os.walk(root):
+            for name in files:
+                if name.lower().endswith(TIFF_EXTENSIONS):
+                    path = os.path.abspath(os.path.join(folder, name))
+                    stat = os.stat(path)
+                    on_disk[path] = (stat.st_size, stat.st_mtime_ns)
+
+        prefix = os.path.join(os.path.abspath(root), "")
+        with self._connect() as conn:
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in conn.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                )
+            }
+        removed = [path for path in known if path not in on_disk]
+        changed = [path for path, stamp in on_disk.items() if known.get(path) != stamp]
+
+        results = []
+        if changed:
+            executor_class = ProcessPoolExecutor if self.use_processes and len(changed) > 1 else ThreadPoolExecutor
+            with executor_class(max_workers=self.max_workers) as executor:
+                chunksize = max(1, len(changed) // (4 * (os.cpu_count() or 1)))
+                for done, result in enumerate(executor.map(index_file, changed, chunksize=chunksize), start=1):
+                    results.append(result)
+                    if progress:
+                        progress(done, len(changed), result[0])
+
+        failed = []
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed + changed])
+            for path, rows, error in results:
+                if rows is None:
+                    # Not recorded, so the file is retried on the next update
+                    failed.append((path, error))
+                    continue
+                size, mtime_ns = on_disk[path]
+                file_id = conn.execute(
+                    "INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)", (path, size, mtime_ns)
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO props (file_id, page, prop_id, value_text, value_num, value_type) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(file_id,) + row for row in rows]
+                )
+
+        return {
+            'Indexed': len(changed) - len(failed),
+            'Unchanged': len(on_disk) - len(changed),
+            'Removed': len(removed),
+            'Failed': failed,
+        }
+
+    def query(self, conditions: List[Tuple[str, str, str]], limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Returns the (path, page) planes matching every (prop_id, op, value) condition.
+        All conditions must hold on the same page. Numeric values compare against the
+        prop's number, anything else against its text.
+        """
+        clauses, params = [], []
+        for prop_id, op, value in conditions:
+            try:
+                number = float(NUMBER_PREFIX.match(value).group(1)) if op != '~' else None
+            except AttributeError:
+                number = None
+            if op == '~':
+                clauses.append("SELECT file_id, page FROM props WHERE prop_id = ? AND value_text LIKE ?")
+                params += [prop_id, f"%{value}%"]
+            elif number is not None and op in NUMERIC_OPERATORS:
+                clauses.append(
+                    f"SELECT file_id, page FROM props WHERE prop_id = ? AND value_num {NUMERIC_OPERATORS[op]} ?"
+                )
+                params += [prop_id, number]
+            elif op in ('=', '!='):
+                clauses.append(f"SELECT file_id, page FROM props WHERE prop_id = ? AND value_text {op} ?")
+                params += [prop_id, value]
+            else:
+                raise ValueError(f"Operator '{op}' needs a numeric value for '{prop_id}'")
+
+        planes = " INTERSECT ".join(clauses) if clauses else "SELECT DISTINCT file_id, page FROM props"
+        sql = f"SELECT f.path, m.page FROM ({planes}) m JOIN files f ON f.id = m.file_id ORDER BY f.path, m.page"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            return [(path, page) for path, page in conn.execute(sql, params)]
+
+    def props_frame(self, planes: List[Tuple[str, int]], prop_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """Returns one row per (path, page) plane with its props as columns"""
+        if not planes:
+            return pd.DataFrame(columns=['Path', 'Page'])
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE wanted (path TEXT, page INTEGER, PRIMARY KEY (path, page))")
+            conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?, ?)", planes)
+            sql = (
+                "SELECT f.path, p.page, p.prop_id, p.value_text, p.value_num, p.value_type "
+                "FROM wanted w JOIN files f ON f.path = w.path JOIN props p ON p.file_id = f.id AND p.page = w.page"
+            )
+            params = []
+            if prop_ids:
+                sql += " WHERE p.prop_id IN (" + ",".join("?" * len(prop_ids)) + ")"
+                params = list(prop_ids)
+            rows = conn.execute(sql, params).fetchall()
+        long = pd.DataFrame(rows, columns=['Path', 'Page', 'prop_id', 'value_text', 'value_num', 'value_type'])
+        # Typed props come back as numbers, everything else as text
+        long['value'] = long['value_text'].astype(object)
+        for value_type, dtype in (('int', 'int64'), ('float', 'float64')):
+            mask = long['value_type'] == value_type
+            long.loc[mask, 'value'] = pd.Series(long.loc[mask, 'value_num'].astype(dtype).tolist(),
+                                                index=long.index[mask], dtype=object)
+        wide = long.pivot(index=['Path', 'Page'], columns='prop_id', values='value').infer_objects()
+        wide.columns.name = None
+        order = list(dict.fromkeys(map(tuple, planes)))
+        return wide.reindex([plane for plane in order if plane in wide.index]).reset_index()
+
+    def prop_ids(self) -> List[str]:
+        """Returns every prop id in the catalog"""
+        with self._connect() as conn:
+            return [prop_id for (prop_id,) in conn.execute("SELECT DISTINCT prop_id FROM props ORDER BY prop_id")]
+
+    def file_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
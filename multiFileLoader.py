@@ -0,0 +1,125 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from CsvDataReader import CsvDataReader
+from JdceDataReader import JdceDataReader
+
+# Provenance columns added to the merged CSV dataset
+PROVENANCE_COLUMNS = ['SourceFile', 'PlateId', 'RunUuid']
+
+
+def parse_jdce(name: str, data: bytes) -> Dict[str, Any]:
+    """
+    Parses one .jdce file's bytes; module level so process pools can pickle it.
+    Errors are raised rather than shown, since st.error does nothing in worker threads.
+    """
+    return JdceDataReader(io.BytesIO(data)).read_data()
+
+
+def parse_csv(name: str, data: bytes) -> pd.DataFrame:
+    """Parses one acquisition CSV's bytes, raising on invalid files"""
+    return CsvDataReader(io.BytesIO(data)).read_data()
+
+
+def file_stem(name: str) -> str:
+    return os.path.splitext(os.path.basename(name))[0].lower()
+
+
+class MultiFileLoader:
+    """
+    Parses many .jdce and .csv files concurrently and merges the CSVs into one dataset.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = False):
+        """
+        Initializes MultiFileLoader. Threads suit pandas' GIL-releasing CSV parser;
+        processes help when many large .jdce files make JSON decoding the bottleneck.
+        """
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+
+    def load(self, jdce_files: List[Tuple[str, bytes]], csv_files: List[Tuple[str, bytes]],
+             progress: Optional[Callable[[int, int, str], None]] = None):
+        """
+        Parses (name, bytes) pairs concurrently.
+        Returns the JDCE data by file name, the merged CSV DataFrame (or None) and a list of
+        (file name, error) pairs for files that could not be parsed.
+        progress(done, total, name) is called from the calling thread as each file finishes.
+        """
+        executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        total = len(jdce_files) + len(csv_files)
+        jdce_results: List[Optional[Dict[str, Any]]] = [None] * len(jdce_files)
+        csv_results: List[Optional[pd.DataFrame]] = [None] * len(csv_files)
+        failed: List[Tuple[str, str]] = []
+
+        with executor_class(max_workers=self.max_workers) as executor:
+            futures = {}
+            for index, (name, data) in enumerate(jdce_files):
+                futures[executor.submit(parse_jdce, name, data)] = (jdce_results, index, name)
+            for index, (name, data) in enumerate(csv_files):
+                futures[executor.submit(parse_csv, name, data)] = (csv_results, index, name)
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                results, index, name = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = None
+                    failed.append((name, str(e) or type(e).__name__))
+                if progress:
+                    progress(done, total, name)
+
+        # Results keep upload order regardless of completion order
+        jdce_data = {name: data for (name, _), data in zip(jdce_files, jdce_results) if data is not None}
+        csv_parts = [(name, df) for (name, _), df in zip(csv_files, csv_results) if df is not None]
+        merged = self.merge(csv_parts, jdce_data)
+        return jdce_data, merged, failed
+
+    @staticmethod
+    def match_jdce(csv_name: str, jdce_names: List[str]) -> Optional[str]:
+        """
+        Picks the .jdce a CSV belongs to: the only one, else the one with the same file stem.
+        Returns None when neither applies, so the CSV is never tagged with another plate.
+        """
+        if len(jdce_names) == 1:
+            return jdce_names[0]
+        stem = file_stem(csv_name)
+        for name in jdce_names:
+            if file_stem(name) == stem:
+                return name
+        return None
+
+    def merge(self, csv_parts: List[Tuple[str, pd.DataFrame]],
+              jdce_data: Dict[str, Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        """
+        Concatenates the parsed CSVs once and adds categorical provenance columns.
+        Provenance is built from per-file codes, so the rows are only copied by the single concat.
+        """
+        if not csv_parts:
+            return None
+        frames = [df for _, df in csv_parts]
+        merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        row_files = np.repeat(np.arange(len(frames), dtype=np.int32), [len(df) for df in frames])
+
+        jdce_names = list(jdce_data)
+        source_files, plate_ids, run_uuids = [], [], []
+        for name, _ in csv_parts:
+            general = jdce_data.get(self.match_jdce(name, jdce_names), {}).get('General Information', {})
+            source_files.append(name)
+            plate_ids.append(general.get('PlateId'))
+            run_uuids.append(general.get('Uuid'))
+
+        def provenance(values):
+            # One category per distinct value; each row takes its file's code
+            labels = ["" if v is None else str(v) for v in values]
+            codes, categories = pd.factorize(pd.Series(labels, dtype=object))
+            return pd.Categorical.from_codes(codes[row_files], categories=categories)
+
+        for position, (column, values) in enumerate(zip(PROVENANCE_COLUMNS, (source_files, plate_ids, run_uuids))):
+            merged.insert(position, column, provenance(values))
+        return merged
@@ -0,0 +1,246 @@
+import re
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Provenance columns of merged multi-file datasets; rows from different files are never duplicates
+PROVENANCE_KEYS = ('SourceFile', 'PlateId', 'RunUuid')
+
+WELL_NAME_PATTERN = re.compile(r"^\s*([A-Za-z]+)\s*0*(\d+)\s*$")
+
+# Column names added to the annotated DataFrame
+VALIDATION_COLUMNS = [
+    'PlateRow', 'PlateColumn', 'ExpectedCenterXUm', 'ExpectedCenterYUm',
+    'OffsetXUm', 'OffsetYUm', 'ValidWell', 'InWell', 'FieldInWell',
+    'DuplicatePosition', 'KnownChannel', 'Valid'
+]
+
+
+def parse_xy(value, default=None) -> Optional[Tuple[float, float]]:
+    """
+    Reads an (x, y) pair from a JDCE geometry value.
+    Accepts {'X': .., 'Y': ..} dicts (any case), [x, y] lists or a single number.
+    """
+    if value is None or value == "":
+        return default
+    if isinstance(value, dict):
+        lowered = {str(k).lower(): v for k, v in value.items()}
+        x = lowered.get('x', lowered.get('width', lowered.get('diameter')))
+        y = lowered.get('y', lowered.get('height', lowered.get('diameter', x)))
+        if x is None:
+            return default
+        return float(x), float(y if y is not None else x)
+    if isinstance(value, (list, tuple)) and len(value) >= 2:
+        return float(value[0]), float(value[1])
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+    return default
+
+
+def well_row_index(letters: str) -> int:
+    """Converts well row letters to a zero-based index (A -> 0, Z -> 25, AA -> 26)"""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    return index - 1
+
+
+class PlateValidator:
+    """
+    Cross-validates CSV image positions against the JDCE plate geometry.
+    """
+
+    def __init__(self, jdce_data: Dict[str, Any]):
+        """
+        Initializes PlateValidator with the output of JdceDataReader.extract_data().
+        """
+        plate = jdce_data.get('Plate Information') or {}
+        self.rows = plate.get('Rows')
+        self.columns = plate.get('Columns')
+        self.top_left = parse_xy(plate.get('TopLeftWellCenterOffset'))
+        self.spacing = parse_xy(plate.get('WellSpacing'))
+        if not self.rows or not self.columns or self.top_left is None or self.spacing is None:
+            raise ValueError("JDCE Plate Information is missing Rows, Columns, TopLeftWellCenterOffset or WellSpacing")
+
+        # Without explicit well dimensions a well owns its whole spacing cell
+        well_parameters = plate.get('WellParameters') or {}
+        self.well_size = parse_xy(well_parameters, default=self.spacing)
+        shape = str(well_parameters.get('Shape', '')).lower() if isinstance(well_parameters, dict) else ''
+        self.round_wells = shape in ('round', 'circle', 'circular')
+
+        self.field_size = self._field_size(jdce_data)
+        self.channels = self._channel_names(jdce_data.get('Wavelength Settings') or [])
+
+    @staticmethod
+    def _field_size(jdce_data) -> Optional[Tuple[float, float]]:
+        """Image field of view in micrometres from the camera size and objective calibration"""
+        camera = jdce_data.get('Camera Settings') or {}
+        calibration = jdce_data.get('Objective Calibration') or {}
+        try:
+            binning = float(camera.get('Binning') or 1)
+            return (
+                float(camera['Width']) * binning * float(calibration['PixelWidth']),
+                float(camera['Height']) * binning * float(calibration['PixelHeight']),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _channel_names(wavelengths) -> set:
+        """Every spelling a CSV filter value may use for the declared wavelengths"""
+        names = set()
+        for wl in wavelengths:
+            excitation = wl.get('ExcitationFilter')
+            emission = wl.get('EmissionFilter')
+            for name in (excitation, emission):
+                if name:
+                    names.add(str(name).strip().lower())
+            if excitation and emission:
+                for sep in ('/', '-', '_', ' '):
+                    names.add(f"{excitation}{sep}{emission}".strip().lower())
+        return names
+
+    def _parse_wells(self, codes: np.ndarray, uniques) -> Tuple[np.ndarray, np.ndarray]:
+        """Maps factorized well names to zero-based row/column arrays, parsing each distinct name once"""
+        unique_rows = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        unique_cols = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        for i, name in enumerate(uniques):
+            match = WELL_NAME_PATTERN.match(str(name))
+            if match:
+                unique_rows[i] = well_row_index(match.group(1))
+                unique_cols[i] = int(match.group(2)) - 1
+        # The NA sentinel code -1 indexes the trailing "invalid" slot
+        return unique_rows[codes], unique_cols[codes]
+
+    def _known_channels(self, codes: np.ndarray, uniques) -> np.ndarray:
+        if not self.channels:
+            return np.ones(len(codes), dtype=bool)
+        known = np.array([str(name).strip().lower() in self.channels for name in uniques] + [False])
+        return known[codes]
+
+    @staticmethod
+    def _duplicates(df: pd.DataFrame, key_codes: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Flags rows sharing well, position, channel and time point.
+        Rows are reduced to one 64-bit hash each so the duplicate check is a single hash-table pass.
+        """
+        keys = dict(key_codes)
+        for name in ('PositionXUm', 'PositionYUm', 'PositionZUm', 'TimePoint'):
+            if name in df.columns:
+                keys[name] = df[name].to_numpy()
+        hashes = pd.util.hash_pandas_object(pd.DataFrame(keys, copy=False), index=False)
+        return hashes.duplicated(keep=False).to_numpy()
+
+    def validate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Checks every CSV row in one vectorized pass.
+        Returns the annotated DataFrame and a summary dictionary.
+        """
+        x = pd.to_numeric(df['PositionXUm'], errors='coerce').to_numpy(dtype=np.float64)
+        y = pd.to_numeric(df['PositionYUm'], errors='coerce').to_numpy(dtype=np.float64)
+        well_codes, well_uniques = pd.factorize(df['Well'], use_na_sentinel=True)
+        rows, cols = self._parse_wells(well_codes, well_uniques)
+
+        valid_well = (rows >= 0) & (cols >= 0) & (rows < self.rows) & (cols < self.columns)
+        center_x = np.where(valid_well, self.top_left[0] + cols * self.spacing[0], np.nan)
+        center_y = np.where(valid_well, self.top_left[1] + rows * self.spacing[1], np.nan)
+        offset_x = x - center_x
+        offset_y = y - center_y
+
+        half_w, half_h = self.well_size[0] / 2, self.well_size[1] / 2
+        with np.errstate(invalid='ignore'):
+            if self.round_wells:
+                in_well = (offset_x / half_w) ** 2 + (offset_y / half_h) ** 2 <= 1.0
+            else:
+                in_well = (np.abs(offset_x) <= half_w) & (np.abs(offset_y) <= half_h)
+
+            if self.field_size is not None:
+                # Corners of the imaged field must stay inside the well too
+                reach_x = np.abs(offset_x) + self.field_size[0] / 2
+                reach_y = np.abs(offset_y) + self.field_size[1] / 2
+                if self.round_wells:
+                    field_in_well = (reach_x / half_w) ** 2 + (reach_y / half_h) ** 2 <= 1.0
+                else:
+                    field_in_well = (reach_x <= half_w) & (reach_y <= half_h)
+            else:
+                field_in_well = in_well
+
+        key_codes = {'Well': well_codes}
+        for name in PROVENANCE_KEYS:
+            if name in df.columns:
+                key_codes[name] = pd.factorize(df[name], use_na_sentinel=True)[0]
+        if 'ExcitationEmissionFilter' in df.columns:
+            channel_codes, channel_uniques = pd.factorize(df['ExcitationEmissionFilter'], use_na_sentinel=True)
+            known_channel = self._known_channels(channel_codes, channel_uniques)
+            key_codes['ExcitationEmissionFilter'] = channel_codes
+        else:
+            known_channel = np.ones(len(df), dtype=bool)
+        duplicate = self._duplicates(df, key_codes)
+
+        valid = valid_well & in_well & ~duplicate & known_channel
+
+        annotated = df.copy(deep=False)
+        annotated['PlateRow'] = rows
+        annotated['PlateColumn'] = cols
+        annotated['ExpectedCenterXUm'] = center_x
+        annotated['ExpectedCenterYUm'] = center_y
+        annotated['OffsetXUm'] = offset_x
+        annotated['OffsetYUm'] = offset_y
+        annotated['ValidWell'] = valid_well
+        annotated['InWell'] = in_well
+        annotated['FieldInWell'] = field_in_well
+        annotated['DuplicatePosition'] = duplicate
+        annotated['KnownChannel'] = known_channel
+        annotated['Valid'] = valid
+
+        unknown_channels = []
+        if 'ExcitationEmissionFilter' in df.columns and not known_channel.all():
+            unknown_channels = sorted(map(str, pd.unique(df['ExcitationEmissionFilter'][~known_channel])))
+
+        summary = {
+            'Rows Checked': int(len(df)),
+            'Valid Rows': int(valid.sum()),
+            'Invalid Well Names': int((~valid_well).sum()),
+            'Outside Well': int((valid_well & ~in_well).sum()),
+            'Field Exceeds Well': int((in_well & ~field_in_well).sum()),
+            'Duplicate Positions': int(duplicate.sum()),
+            'Unknown Channel Rows': int((~known_channel).sum()),
+            'Unknown Channels': unknown_channels,
+        }
+        return annotated, summary
+
+
+def merge_summaries(summaries) -> Dict[str, Any]:
+    """Adds up the counts of several validation summaries"""
+    merged = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            if key == 'Unknown Channels':
+                merged[key] = sorted(set(merged.get(key, [])) | set(value))
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def validate_by_source(df: pd.DataFrame, jdce_by_source: Dict[str, Optional[Dict[str, Any]]]
+                       ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Validates a merged multi-file dataset one SourceFile group at a time,
+    each against its own JDCE. Groups without a JDCE are skipped and listed
+    under 'Sources Without JDCE' rather than checked against another plate.
+    """
+    parts, summaries, unmatched = [], [], []
+    for source, index in df.groupby('SourceFile', observed=True, sort=False).indices.items():
+        jdce_data = jdce_by_source.get(source)
+        if jdce_data is None:
+            unmatched.append(str(source))
+            continue
+        annotated, summary = PlateValidator(jdce_data).validate(df.iloc[index])
+        parts.append(annotated)
+        summaries.append(summary)
+    if not parts:
+        raise ValueError("None of the CSV files has a matching JDCE file")
+    summary = merge_summaries(summaries)
+    summary['Sources Without JDCE'] = unmatched
+    return pd.concat(parts) if len(parts) > 1 else parts[0], summary
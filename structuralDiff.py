@@ -0,0 +1,377 @@
+"""
+Structural diff for .mxprotocol and .jdce JSON documents.
+
+Each document is turned into a Merkle tree once: every dict and list gets a
+digest computed bottom-up from its children, so two subtrees with equal
+digests are identical and the diff skips them without descending. List
+elements are matched by an identifying key (id, name, Index, ...) when the
+elements are objects that carry one, otherwise by content digest and then
+by position. Matched elements whose order changed are reported as moved.
+"""
+import bisect
+import fnmatch
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Keys tried, in order, to match list elements between two documents
+LIST_KEY_CANDIDATES = (
+    'id', 'Id', 'ID', 'uuid', 'Uuid', 'commandId', 'name', 'Name', 'wellName',
+    'commandName', 'index', 'Index', 'key', 'Key'
+)
+
+# Parsed trees kept in memory, keyed by file identity or content digest. The byte cap
+# counts JSON source bytes; a tree takes roughly seven times its source in memory.
+TREE_CACHE_SIZE = 64
+TREE_CACHE_SOURCE_BYTES = 64 * 2**20
+_tree_cache: "OrderedDict[Any, Tuple[MerkleNode, int]]" = OrderedDict()
+_tree_cache_size = 0
+_tree_cache_lock = threading.Lock()
+
+
+class MerkleNode:
+    """
+    A dict or list with a digest of its whole subtree.
+    Scalar children are stored as plain values.
+    """
+    __slots__ = ('kind', 'digest', 'children', 'value', '_ids')
+
+    def __init__(self, kind: str, digest: bytes, children, value):
+        self.kind = kind
+        self.digest = digest
+        self.children = children
+        self.value = value
+        self._ids = None
+
+    @property
+    def ids(self) -> List[Any]:
+        """Identities of a list's elements, computed on first use and kept with the cached tree"""
+        if self._ids is None:
+            self._ids = [identity(child) for child in self.children]
+        return self._ids
+
+
+def build_tree(value) -> Any:
+    """
+    Builds the Merkle tree of a parsed JSON value; scalars are returned unchanged.
+    A container's digest covers the repr of its scalar children (which keeps 1, 1.0,
+    True and "1" apart) and the digests of its container children, so each container
+    costs one repr and one hash call.
+    """
+    if isinstance(value, dict):
+        # JSON object keys are always strings, so sorting the items never compares values
+        if any(isinstance(child, (dict, list)) for child in value.values()):
+            children = {
+                key: build_tree(child) if isinstance(child, (dict, list)) else child
+                for key, child in value.items()
+            }
+            items = sorted(
+                (key, child.digest if isinstance(child, MerkleNode) else child)
+                for key, child in children.items()
+            )
+        else:
+            children = value
+            items = sorted(value.items())
+        digest = hashlib.blake2b(b'd' + repr(items).encode('utf-8'), digest_size=16).digest()
+        return MerkleNode('dict', digest, children, value)
+    if isinstance(value, list):
+        if any(isinstance(child, (dict, list)) for child in value):
+            children = [build_tree(child) if isinstance(child, (dict, list)) else child for child in value]
+            items = [child.digest if isinstance(child, MerkleNode) else child for child in children]
+        else:
+            children = items = value
+        digest = hashlib.blake2b(b'l' + repr(items).encode('utf-8'), digest_size=16).digest()
+        return MerkleNode('list', digest, children, value)
+    return value
+
+
+def identity(node) -> Any:
+    """Hashable identity of a tree node: its digest, or the typed scalar value"""
+    if isinstance(node, MerkleNode):
+        return node.digest
+    return (type(node).__name__, node)
+
+
+def to_value(node) -> Any:
+    return node.value if isinstance(node, MerkleNode) else node
+
+
+def _cache_get(key) -> Optional[MerkleNode]:
+    with _tree_cache_lock:
+        entry = _tree_cache.get(key)
+        if entry is None:
+            return None
+        _tree_cache.move_to_end(key)
+        return entry[0]
+
+
+def _cache_put(key, tree, size: int):
+    global _tree_cache_size
+    with _tree_cache_lock:
+        if key in _tree_cache:
+            _tree_cache_size -= _tree_cache.pop(key)[1]
+        _tree_cache[key] = (tree, size)
+        _tree_cache_size += size
+        while len(_tree_cache) > 1 and (
+                len(_tree_cache) > TREE_CACHE_SIZE or _tree_cache_size > TREE_CACHE_SOURCE_BYTES):
+            _, (_, evicted) = _tree_cache.popitem(last=False)
+            _tree_cache_size -= evicted
+
+
+def tree_from_bytes(data: bytes) -> MerkleNode:
+    """
+    Parses and hashes JSON bytes, reusing the tree when the same content was seen before.
+    Raises ValueError unless the document is a JSON object or array.
+    """
+    key = ('content', hashlib.blake2b(data, digest_size=16).digest())
+    tree = _cache_get(key)
+    if tree is None:
+        # Built outside the lock; concurrent builds of the same content store equal trees
+        tree = build_tree(json.loads(data.decode('utf-8-sig')))
+        if not isinstance(tree, MerkleNode):
+            raise ValueError("Document is not a JSON object or array")
+        _cache_put(key, tree, len(data))
+    return tree
+
+
+def tree_from_file(path: str) -> MerkleNode:
+    """Parses and hashes a JSON file, reusing the tree while its size and mtime are unchanged"""
+    stat = os.stat(path)
+    key = ('file', os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    tree = _cache_get(key)
+    if tree is None:
+        with open(path, 'rb') as f:
+            tree = tree_from_bytes(f.read())
+        _cache_put(key, tree, stat.st_size)
+    return tree
+
+
+def _format_key(key) -> str:
+    return f".{key}" if isinstance(key, str) else f"[{key!r}]"
+
+
+def _common_prefix(a: List[Any], b: List[Any]) -> int:
+    """Length of the common prefix, found by binary search over C-level slice comparisons"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: List[Any], b: List[Any], start: int) -> int:
+    """Length of the common suffix that does not overlap the first start elements"""
+    lo, hi = 0, min(len(a), len(b)) - start
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _out_of_order(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Returns the (old index, new index) pairs that moved: all but a longest run whose
+    new indices increase in old order, i.e. the fewest elements that explain the reorder.
+    """
+    pairs = sorted(pairs)
+    tails, tail_ids, parents = [], [], [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        parents[n] = tail_ids[k - 1] if k else -1
+        if k == len(tails):
+            tails.append(j)
+            tail_ids.append(n)
+        else:
+            tails[k] = j
+            tail_ids[k] = n
+    in_order = set()
+    n = tail_ids[-1] if tail_ids else -1
+    while n >= 0:
+        in_order.add(n)
+        n = parents[n]
+    return [pair for n, pair in enumerate(pairs) if n not in in_order]
+
+
+def _identifies(nodes: List[MerkleNode], key) -> bool:
+    """True when every node has a distinct scalar value for key"""
+    seen = set()
+    for node in nodes:
+        value = node.children.get(key, MerkleNode)
+        if value is MerkleNode or isinstance(value, MerkleNode) or value in seen:
+            return False
+        seen.add(value)
+    return True
+
+
+def _list_match_key(old: List[Any], new: List[Any]) -> Optional[str]:
+    """Returns a key whose scalar values uniquely identify the dict elements of both lists"""
+    items = old + new
+    if not items or not all(isinstance(n, MerkleNode) and n.kind == 'dict' for n in items):
+        return None
+    for candidate in LIST_KEY_CANDIDATES:
+        if _identifies(old, candidate) and _identifies(new, candidate):
+            return candidate
+    return None
+
+
+class StructuralDiff:
+    """
+    Computes a compact change list between two JSON documents.
+    """
+
+    def __init__(self, max_changes: Optional[int] = None):
+        """
+        Initializes StructuralDiff. max_changes stops the diff early once that many changes were found.
+        """
+        self.max_changes = max_changes
+
+    def diff(self, old, new) -> List[Dict[str, Any]]:
+        """
+        Diffs two Merkle trees (or plain JSON values).
+        Each change is a dict with 'op' (added/removed/changed/moved), 'path', 'old' and 'new';
+        for moved elements 'old' and 'new' are the list positions.
+        """
+        if not isinstance(old, MerkleNode) and isinstance(old, (dict, list)):
+            old = build_tree(old)
+        if not isinstance(new, MerkleNode) and isinstance(new, (dict, list)):
+            new = build_tree(new)
+        self._changes = []
+        self._walk(old, new, "$")
+        return self._changes
+
+    def _full(self) -> bool:
+        return self.max_changes is not None and len(self._changes) >= self.max_changes
+
+    def _add(self, op, path, old=None, new=None):
+        if not self._full():
+            self._changes.append({'op': op, 'path': path, 'old': to_value(old), 'new': to_value(new)})
+
+    def _walk(self, old, new, path):
+        if self._full():
+            return
+        old_node = isinstance(old, MerkleNode)
+        new_node = isinstance(new, MerkleNode)
+        if old_node and new_node:
+            if old.digest == new.digest:
+                return  # identical subtree
+            if old.kind != new.kind:
+                self._add('changed', path, old, new)
+            elif old.kind == 'dict':
+                self._walk_dict(old, new, path)
+            else:
+                self._walk_list(old, new, path)
+        elif old_node or new_node or identity(old) != identity(new):
+            self._add('changed', path, old, new)
+
+    def _walk_dict(self, old: MerkleNode, new: MerkleNode, path):
+        for key, old_child in old.children.items():
+            child_path = path + _format_key(key)
+            if key in new.children:
+                self._walk(old_child, new.children[key], child_path)
+            else:
+                self._add('removed', child_path, old=old_child)
+        for key, new_child in new.children.items():
+            if key not in old.children:
+                self._add('added', path + _format_key(key), new=new_child)
+
+    def _walk_list(self, old_node: MerkleNode, new_node: MerkleNode, path):
+        old, new = old_node.children, new_node.children
+
+        # Strip the common prefix and suffix first; appends and local edits end up
+        # with a handful of elements left to match
+        start = _common_prefix(old_node.ids, new_node.ids)
+        suffix = _common_suffix(old_node.ids, new_node.ids, start)
+        end_old, end_new = len(old) - suffix, len(new) - suffix
+
+        match_key = _list_match_key(old[start:end_old], new[start:end_new])
+        if match_key is not None:
+            self._walk_keyed_list(old[start:end_old], new[start:end_new], path, match_key, start)
+            return
+
+        # Elements present on both sides by content are unchanged, just moved
+        unmatched_new = defaultdict(list)
+        for j in reversed(range(start, end_new)):
+            unmatched_new[new_node.ids[j]].append(j)
+        remaining_old = []
+        matched = {}
+        for i in range(start, end_old):
+            candidates = unmatched_new.get(old_node.ids[i])
+            if candidates:
+                matched[candidates.pop()] = i
+            else:
+                remaining_old.append(i)
+        remaining_new = [j for j in range(start, end_new) if j not in matched]
+        for i, j in _out_of_order([(i, j) for j, i in matched.items()]):
+            self._add('moved', f"{path}[{j}]", old=i, new=j)
+
+        # Whatever is left is paired by position and diffed recursively
+        for i, j in zip(remaining_old, remaining_new):
+            self._walk(old[i], new[j], f"{path}[{j}]")
+        for i in remaining_old[len(remaining_new):]:
+            self._add('removed', f"{path}[{i}]", old=old[i])
+        for j in remaining_new[len(remaining_old):]:
+            self._add('added', f"{path}[{j}]", new=new[j])
+
+    def _walk_keyed_list(self, old: List[MerkleNode], new: List[MerkleNode], path, match_key, offset=0):
+        new_by_key = {node.children[match_key]: (j, node) for j, node in enumerate(new)}
+        old_keys = set()
+        pairs = []
+        for i, node in enumerate(old):
+            key = node.children[match_key]
+            old_keys.add(key)
+            child_path = f"{path}[{match_key}={key!r}]"
+            if key in new_by_key:
+                j, new_child = new_by_key[key]
+                pairs.append((i, j))
+                self._walk(node, new_child, child_path)
+            else:
+                self._add('removed', child_path, old=node)
+        # Positions are reported relative to the whole list, not the stripped slice
+        for i, j in _out_of_order(pairs):
+            key = old[i].children[match_key]
+            self._add('moved', f"{path}[{match_key}={key!r}]", old=i + offset, new=j + offset)
+        for node in new:
+            key = node.children[match_key]
+            if key not in old_keys:
+                self._add('added', f"{path}[{match_key}={key!r}]", new=node)
+
+
+def diff_files(old_path: str, new_path: str, max_changes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Diffs two .mxprotocol/.jdce files"""
+    return StructuralDiff(max_changes).diff(tree_from_file(old_path), tree_from_file(new_path))
+
+
+def compare_to_directory(tree: MerkleNode, directory: str, patterns=('*.mxprotocol', '*.jdce'),
+                         max_changes: Optional[int] = 1000) -> List[Tuple[str, int, bool]]:
+    """
+    Diffs a document against every matching file under a directory, in the
+    document -> file direction used by diff_files and the compare view.
+    Returns (path, change count, identical) tuples, closest match first.
+    Change counts are capped at max_changes.
+    """
+    results = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not any(fnmatch.fnmatch(name.lower(), pattern) for pattern in patterns):
+                continue
+            path = os.path.join(root, name)
+            try:
+                other = tree_from_file(path)
+            except (OSError, ValueError):
+                continue
+            if other.digest == tree.digest:
+                results.append((path, 0, True))
+                continue
+            changes = StructuralDiff(max_changes).diff(tree, other)
+            results.append((path, len(changes), False))
+    results.sort(key=lambda r: (r[1], r[0]))
+    return results
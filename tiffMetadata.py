@@ -0,0 +1,68 @@
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, List, Optional
+
+import tifffile
+
+logger = logging.getLogger(__name__)
+
+
+def convert_prop_value(prop_type: Optional[str], prop_value: Optional[str]) -> Any:
+    """Convert a <prop> value string according to its declared type"""
+    if prop_type == "int":
+        return int(prop_value)
+    elif prop_type == "float":
+        return float(prop_value)
+    return prop_value
+
+
+def parse_description_props(description: str, log: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """Parse the MetaMorph-style <prop id type value> XML of an ImageDescription"""
+    log = log or logger
+    metadata = {}
+    try:
+        root = ET.fromstring(description)
+        for prop in root.findall('.//prop'):
+            prop_id = prop.get('id')
+            prop_type = prop.get('type')
+            prop_value = prop.get('value')
+            try:
+                metadata[prop_id] = convert_prop_value(prop_type, prop_value)
+            except (ValueError, TypeError):
+                log.warning(
+                    f"Could not convert value '{prop_value}' to type '{prop_type}' for id '{prop_id}'"
+                )
+    except ET.ParseError as e:
+        log.error(f"XML Parse Error: {e}")
+    return metadata
+
+
+def read_tiff_page_metadata(source, log: Optional[logging.Logger] = None, start: int = 0) -> List[Dict[str, Any]]:
+    """
+    Read the ImageDescription props of each page of a TIFF from page start on,
+    one dict per page, raising if the file cannot be read.
+    """
+    pages = []
+    with tifffile.TiffFile(source) as tif:
+        for page in tif.pages[start:]:
+            tag = page.tags.get("ImageDescription")
+            pages.append(parse_description_props(tag.value, log) if tag is not None else {})
+    return pages
+
+
+def read_tiff_metadata(source, log: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """Read ImageDescription props from every page of a TIFF, later pages overriding earlier ones"""
+    metadata = {}
+    for page_metadata in read_tiff_page_metadata(source, log):
+        metadata.update(page_metadata)
+    return metadata
+
+
+def extract_tiff_metadata(source, log: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """Extract ImageDescription props from every page of a TIFF file path or file object"""
+    log = log or logger
+    try:
+        return read_tiff_metadata(source, log)
+    except Exception as e:
+        log.error(f"Error reading TIFF metadata: {e}")
+        return {}